@@ -2,23 +2,28 @@
 Claude AI personality engine — the brain of CoopBuddy.
 
 Handles both reactive (voice input) and proactive (game event) responses.
-Maintains conversation history with game state context injection.
+Maintains conversation history; game state context is injected per request.
 """
 
 import asyncio
 import json
 import logging
 import os
-import re
 import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Awaitable, Callable, Mapping, Optional
 
-from anthropic import Anthropic
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 
+from server.message_schema import dumps
 from server.mood import MoodTracker
 from server.memory import MemoryBank
+from server.rate_limit import TokenBucket
 
 load_dotenv()
 
@@ -27,15 +32,37 @@ logger = logging.getLogger(__name__)
 # ── Load settings ────────────────────────────────────────────────────────────
 
 _SETTINGS_PATH = Path(__file__).resolve().parent.parent / "config" / "settings.json"
-with open(_SETTINGS_PATH) as f:
-    _SETTINGS = json.load(f)
 
-_BRAIN = _SETTINGS["brain"]
-MODEL = _BRAIN["model"]
-MAX_TOKENS = _BRAIN["max_tokens"]
-HISTORY_LENGTH = _BRAIN["history_length"]
-COOLDOWNS = _BRAIN["cooldowns"]
-MAX_QUEUE_DEPTH = _BRAIN["max_queue_depth"]
+
+@dataclass(frozen=True, slots=True)
+class _BrainConfig:
+    """Immutable view of the "brain" section of settings.json."""
+    model: str
+    max_tokens: int
+    history_length: int
+    cooldowns: Mapping[str, int]
+    max_queue_depth: int
+    event_dedup_seconds: float
+    claude_rps: float
+    claude_max_retries: int
+
+
+def _load_config() -> _BrainConfig:
+    with open(_SETTINGS_PATH) as f:
+        brain = json.load(f)["brain"]
+    return _BrainConfig(
+        model=brain["model"],
+        max_tokens=brain["max_tokens"],
+        history_length=brain["history_length"],
+        cooldowns=MappingProxyType(dict(brain["cooldowns"])),
+        max_queue_depth=brain["max_queue_depth"],
+        event_dedup_seconds=brain.get("event_dedup_seconds", 10),
+        claude_rps=brain.get("claude_rps", 2),
+        claude_max_retries=brain.get("claude_max_retries", 3),
+    )
+
+
+_CFG = _load_config()
 
 # ── System prompt ────────────────────────────────────────────────────────────
 
@@ -88,59 +115,111 @@ PROACTIVE EVENTS:
 - Death reactions should be empathetic but funny — "bro... not again" vibes.
 - "I died" means YOU died, not the player. The player is a separate person."""
 
+# Structured form with a cache breakpoint, so the static prompt is a cached prefix
+_SYSTEM_BLOCK = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
 # ── Action parsing ───────────────────────────────────────────────────────────
 
-_ACTION_PATTERN = re.compile(r"\[ACTION:(\w+)(?::([^\]]*))?\]")
+_ACTION_TAG = "[ACTION:"
+
+
+def _look_at_action(param: str) -> Optional[dict]:
+    parts = param.split(",")
+    if len(parts) != 3:
+        return None
+    return {"action": "look_at", "params": {
+        "x": float(parts[0]), "y": float(parts[1]), "z": float(parts[2])
+    }}
+
+
+# action type → builder from the raw tag param (None = ignore the tag)
+_ACTION_HANDLERS = {
+    "send_chat": lambda p: {"action": "send_chat", "params": {"message": p}},
+    "follow_player": lambda p: {"action": "follow_player", "params": {"name": p}},
+    "stop_follow": lambda p: {"action": "stop_follow", "params": {}},
+    "look_at": _look_at_action,
+    "eat": lambda p: {"action": "eat", "params": {}},
+    "attack_mob": lambda p: {"action": "attack_mob", "params": {"name": p if p else None}},
+    "flee": lambda p: {"action": "flee", "params": {}},
+    "stop_attack": lambda p: {"action": "stop_attack", "params": {}},
+}
 
 
 def _extract_actions(text: str) -> tuple[str, list[dict]]:
-    """Extract [ACTION:type:param] tags from response. Returns (clean_text, actions)."""
+    """
+    Extract [ACTION:type:param] tags from response. Returns (clean_text, actions).
+    clean_text is collapsed onto one line — a newline would make mineflayer split
+    the chat into several messages (and TTS would only speak the last one).
+    """
+    parts = []
     actions = []
-    for match in _ACTION_PATTERN.finditer(text):
-        action_type = match.group(1)
-        param = match.group(2) or ""
-        if action_type == "send_chat":
-            actions.append({"action": "send_chat", "params": {"message": param}})
-        elif action_type == "follow_player":
-            actions.append({"action": "follow_player", "params": {"name": param}})
-        elif action_type == "stop_follow":
-            actions.append({"action": "stop_follow", "params": {}})
-        elif action_type == "look_at":
-            parts = param.split(",")
-            if len(parts) == 3:
-                actions.append({"action": "look_at", "params": {
-                    "x": float(parts[0]), "y": float(parts[1]), "z": float(parts[2])
-                }})
-        elif action_type == "eat":
-            actions.append({"action": "eat", "params": {}})
-        elif action_type == "attack_mob":
-            actions.append({"action": "attack_mob", "params": {"name": param if param else None}})
-        elif action_type == "flee":
-            actions.append({"action": "flee", "params": {}})
-        elif action_type == "stop_attack":
-            actions.append({"action": "stop_attack", "params": {}})
-    clean = _ACTION_PATTERN.sub("", text).strip()
-    return clean, actions
+    prev = i = 0
+    while True:
+        i = text.find(_ACTION_TAG, i)
+        if i == -1:
+            break
+        end = text.find("]", i)
+        if end == -1:
+            break
+        action_type, _, param = text[i + len(_ACTION_TAG):end].partition(":")
+        if not action_type.isidentifier():
+            # Not a well-formed tag — leave it in the text and keep scanning
+            i += 1
+            continue
+        parts.append(text[prev:i])
+        handler = _ACTION_HANDLERS.get(action_type)
+        if handler:
+            action = handler(param)
+            if action:
+                actions.append(action)
+        prev = i = end + 1
+    parts.append(text[prev:])
+    return " ".join("".join(parts).split()), actions
+
+
+_SENTENCE_ENDS = ".!?\n"
+
+
+def _split_speakable(buf: str) -> tuple[str, str]:
+    """
+    Split streamed text at its last sentence boundary.
+    Returns (speakable text with actions stripped, remainder). Holds everything
+    back while the boundary sits inside an unfinished [ACTION:...] tag.
+    """
+    for i in range(len(buf) - 1, -1, -1):
+        if buf[i] in _SENTENCE_ENDS and (buf[i] == "\n" or (i + 1 < len(buf) and buf[i + 1].isspace())):
+            break
+    else:
+        return "", buf
+    head = buf[:i + 1]
+    if head.rfind(_ACTION_TAG) > head.rfind("]"):
+        return "", buf
+    clean, _ = _extract_actions(head)
+    return clean, buf[i + 1:]
 
 
 # ── Conversation history ─────────────────────────────────────────────────────
 
 class ConversationHistory:
-    """Rolling window of conversation turns with game state injection."""
+    """
+    Rolling window of conversation turns.
+
+    Stores raw text only — volatile context (game state, mood, memory) goes in
+    the request tail, so the stored turns stay byte-identical across requests.
+    """
 
-    def __init__(self, max_turns: int = HISTORY_LENGTH):
+    def __init__(self, max_turns: int = _CFG.history_length):
         self._max = max_turns
+        # Plain list on purpose: a deque(maxlen=...) would evict a message every
+        # turn and shift the prefix. Here memory stays bounded by _hard_max and
+        # the only copy is one slice per snap in _trim, never a per-turn pop(0).
         self._turns: list[dict] = []
+        # Let the window grow to 2x before snapping back, so consecutive
+        # requests share an identical message prefix (prompt cache hits)
+        self._hard_max = max_turns * 4  # 2 messages per turn
 
-    def add_user(self, text: str, game_state: Optional[dict] = None,
-                 mood: str = "chill", memory_block: str = ""):
-        content = ""
-        if game_state:
-            content += _format_game_state(game_state, mood) + "\n\n"
-        if memory_block:
-            content += memory_block + "\n\n"
-        content += text
-        self._turns.append({"role": "user", "content": content})
+    def add_user(self, text: str):
+        self._turns.append({"role": "user", "content": text})
         self._trim()
 
     def add_assistant(self, text: str):
@@ -148,11 +227,25 @@ class ConversationHistory:
         self._trim()
 
     def get_messages(self) -> list[dict]:
-        return list(self._turns)
+        """Copy of the history with a prompt-cache breakpoint on the last turn."""
+        messages = list(self._turns)
+        if messages:
+            last = messages[-1]
+            messages[-1] = {"role": last["role"], "content": [{
+                "type": "text",
+                "text": last["content"],
+                "cache_control": {"type": "ephemeral"},
+            }]}
+        return messages
 
     def _trim(self):
-        while len(self._turns) > self._max * 2:  # 2 messages per turn
-            self._turns.pop(0)
+        if len(self._turns) <= self._hard_max:
+            return
+        # Snap back to the most recent max_turns in one step, starting on a user turn
+        start = len(self._turns) - self._max * 2
+        if self._turns[start]["role"] != "user":
+            start += 1
+        self._turns = self._turns[start:]
 
 
 def _roman(n: int) -> str:
@@ -195,58 +288,146 @@ def _format_game_state(gs: dict, mood: str = "chill") -> str:
     return "[GAME STATE] " + " | ".join(parts)
 
 
+def _format_context(text: str, state_block: str = "", memory_block: str = "") -> str:
+    """Prefix user text with the current [GAME STATE] and [MEMORY] blocks."""
+    content = ""
+    if state_block:
+        content += state_block + "\n\n"
+    if memory_block:
+        content += memory_block + "\n\n"
+    return content + text
+
+
 # ── Brain ────────────────────────────────────────────────────────────────────
 
+# Receives each sentence of a streamed reply (action tags already stripped)
+SpeechCallback = Callable[[str], Awaitable[None]]
+
+
+_RECENT_EVENTS_MAX = 64
+
+
+def _event_key(event_type: str, data: dict) -> tuple:
+    """Hashable identity of an event payload (repr fallback for nested data)."""
+    if all(isinstance(v, (str, int, float, bool, type(None))) for v in data.values()):
+        return event_type, tuple(sorted(data.items()))
+    return event_type, repr(data)
+
+
+def _put_dropping_oldest(queue: asyncio.Queue, item) -> Optional[object]:
+    """Enqueue item, evicting the oldest entry if full. Returns the evicted entry."""
+    dropped = None
+    if queue.full():
+        try:
+            dropped = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+    return dropped
+
+
+async def _speak_reply(sentences: asyncio.Queue, on_speech: SpeechCallback,
+                       previous: Optional[asyncio.Future], turn: asyncio.Future):
+    """
+    Speak one reply's sentences once the previous reply is done. Each sentence
+    is handed to on_speech as it arrives (so TTS can synthesize ahead), and
+    turn resolves after the last one finishes. None ends the reply.
+    """
+    try:
+        if previous is not None:
+            await asyncio.shield(previous)
+        tasks = []
+        while (sentence := await sentences.get()) is not None:
+            tasks.append(asyncio.create_task(on_speech(sentence)))
+        await asyncio.gather(*tasks)
+    finally:
+        if not turn.done():
+            turn.set_result(None)
+
+
 class Brain:
     """Core AI engine. Handles voice input and proactive game events."""
 
     def __init__(self, game_state: dict, mood_tracker: MoodTracker = None,
                  memory_bank: MemoryBank = None):
-        self._client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # Native asyncio client; keep-alive HTTP/2 so calls reuse one TLS connection
+        # The SDK retries 429/5xx with exponential backoff up to max_retries
+        self._client = AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            max_retries=_CFG.claude_max_retries,
+            http_client=DefaultAsyncHttpxClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            ),
+        )
         self._history = ConversationHistory()
+        # Global cap on Claude calls across voice and all proactive event types
+        self._limiter = TokenBucket(rate=_CFG.claude_rps)
         self._game_state = game_state
+        self._state_cache: Optional[tuple[str, str]] = None  # (mood, formatted block)
         self._mood_tracker = mood_tracker
         self._memory_bank = memory_bank
         self._voice_active = False
+        # Resolves once the most recent reply has finished speaking
+        self._speech_turn: Optional[asyncio.Future] = None
 
         # Proactive rate limiting
         self._last_event_time: dict[str, float] = {}
+        self._recent_events: OrderedDict[tuple, float] = OrderedDict()  # event key → last seen
         self._proactive_lock = asyncio.Lock()
-        self._proactive_queue = asyncio.Queue(maxsize=MAX_QUEUE_DEPTH)
+        self._proactive_queue = asyncio.Queue(maxsize=_CFG.max_queue_depth)
 
     def update_game_state(self, game_state: dict):
         """Update cached game state (called on every game_state event)."""
         self._game_state.update(game_state)
+        self._state_cache = None
 
     def set_voice_active(self, active: bool):
         """Suppress proactive events while PTT is held."""
         self._voice_active = active
 
-    async def think(self, user_input: str) -> tuple[str, list[dict]]:
+    async def think(self, user_input: str,
+                    on_speech: Optional[SpeechCallback] = None) -> tuple[str, list[dict], Optional[asyncio.Future]]:
         """
         Process voice input. Always runs (no cooldown).
-        Returns (response_text, actions).
+        If on_speech is given, each sentence is passed to it as the reply streams in.
+        Returns (response_text, actions, speech). speech resolves once every
+        on_speech call finishes (None without on_speech) — returned rather than
+        awaited so actions don't wait on playback.
         """
-        mood = self._mood_tracker.mood if self._mood_tracker else "chill"
-        memory_block = self._memory_bank.format() if self._memory_bank else ""
-        self._history.add_user(user_input, self._game_state, mood=mood, memory_block=memory_block)
-
-        response = await self._call_claude(self._history.get_messages())
+        response, speech = await self._call_claude(self._build_messages(user_input), on_speech)
 
         text, actions = _extract_actions(response)
+        self._history.add_user(user_input)
         self._history.add_assistant(response)
 
-        return text, actions
+        return text, actions, speech
 
-    async def handle_game_event(self, event_type: str, data: dict) -> Optional[tuple[str, list[dict]]]:
+    async def handle_game_event(self, event_type: str, data: dict,
+                                on_speech: Optional[SpeechCallback] = None,
+                                ) -> Optional[tuple[str, list[dict], Optional[asyncio.Future]]]:
         """
         Process a proactive game event. Respects cooldowns and voice suppression.
-        Returns (response_text, actions) or None if suppressed.
+        on_speech works as in think().
+        Returns (response_text, actions, speech) or None if suppressed.
         """
         if self._voice_active:
             logger.debug(f"Suppressed proactive event '{event_type}' — voice active")
             return None
 
+        now = time.monotonic()
+
+        # Exact repeat of a recent event (jittery source) — drop before any other work
+        key = _event_key(event_type, data)
+        seen = self._recent_events.get(key)
+        if seen is not None and now - seen < _CFG.event_dedup_seconds:
+            logger.debug(f"Suppressed '{event_type}' — duplicate payload")
+            return None
+        self._recent_events[key] = now
+        self._recent_events.move_to_end(key)
+        if len(self._recent_events) > _RECENT_EVENTS_MAX:
+            self._recent_events.popitem(last=False)
+
         # Death clears any queued events — combat/health events before death are stale
         if event_type == "player_death":
             cleared = 0
@@ -260,120 +441,199 @@ class Brain:
                 logger.debug(f"Cleared {cleared} queued events on player_death")
 
         # Per-event cooldown
-        cooldown = COOLDOWNS.get(event_type, 30)
-        now = time.time()
-        last = self._last_event_time.get(event_type, 0)
+        cooldown = _CFG.cooldowns.get(event_type, 30)
+        last = self._last_event_time.get(event_type, float("-inf"))
         if now - last < cooldown:
             logger.debug(f"Suppressed '{event_type}' — cooldown ({now - last:.0f}s < {cooldown}s)")
             return None
 
         # Try to acquire the proactive lock (limit=1 concurrent)
         if self._proactive_lock.locked():
-            # Queue if room, otherwise drop
-            try:
-                self._proactive_queue.put_nowait((event_type, data))
-                logger.debug(f"Queued proactive event '{event_type}'")
-            except asyncio.QueueFull:
-                logger.debug(f"Dropped proactive event '{event_type}' — queue full")
+            # Queue it; when full, the oldest pending event is the stalest one to lose
+            dropped = _put_dropping_oldest(self._proactive_queue, (event_type, data))
+            if dropped:
+                logger.debug(f"Dropped queued event '{dropped[0]}' — queue full")
+            logger.debug(f"Queued proactive event '{event_type}'")
             return None
 
         async with self._proactive_lock:
-            self._last_event_time[event_type] = now
+            return await self._respond_to_event(event_type, data, now, on_speech)
 
-            if self._mood_tracker:
-                self._mood_tracker.on_event(event_type, data)
-                self._mood_tracker.tick()
-            if self._memory_bank:
-                self._memory_bank.add(event_type, data)
-
-            mood = self._mood_tracker.mood if self._mood_tracker else "chill"
-            memory_block = self._memory_bank.format() if self._memory_bank else ""
-
-            prompt = _build_event_prompt(event_type, data)
-            self._history.add_user(prompt, self._game_state, mood=mood, memory_block=memory_block)
+    async def handle_queued_event(self, on_speech: Optional[SpeechCallback] = None,
+                                  ) -> Optional[tuple[str, list[dict], Optional[asyncio.Future]]]:
+        """
+        Respond to the oldest event still queued behind the proactive lock.
+        Call after handling a handle_game_event() result, until it returns None.
+        Events whose cooldown restarted while they waited are skipped.
+        """
+        while not self._voice_active and not self._proactive_lock.locked():
+            try:
+                event_type, data = self._proactive_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+            now = time.monotonic()
+            cooldown = _CFG.cooldowns.get(event_type, 30)
+            if now - self._last_event_time.get(event_type, float("-inf")) < cooldown:
+                logger.debug(f"Dropped queued event '{event_type}' — cooldown")
+                continue
+            async with self._proactive_lock:
+                return await self._respond_to_event(event_type, data, now, on_speech)
+        return None
+
+    async def _respond_to_event(self, event_type: str, data: dict, now: float,
+                                on_speech: Optional[SpeechCallback],
+                                ) -> tuple[str, list[dict], Optional[asyncio.Future]]:
+        """Claude call for an event that passed rate limiting. Caller holds the proactive lock."""
+        self._last_event_time[event_type] = now
+
+        if self._mood_tracker:
+            self._mood_tracker.on_event(event_type, data)
+            self._mood_tracker.tick()
+        if self._memory_bank:
+            self._memory_bank.add(event_type, data)
+
+        prompt = _build_event_prompt(event_type, data)
+        response, speech = await self._call_claude(self._build_messages(prompt), on_speech)
 
-            response = await self._call_claude(self._history.get_messages())
+        text, actions = _extract_actions(response)
+        self._history.add_user(prompt)
+        self._history.add_assistant(response)
 
-            text, actions = _extract_actions(response)
-            self._history.add_assistant(response)
+        return text, actions, speech
 
-            return text, actions
+    def _build_messages(self, text: str) -> list[dict]:
+        """History plus a final user turn carrying the current volatile context."""
+        mood = self._mood_tracker.mood if self._mood_tracker else "chill"
+        memory_block = self._memory_bank.format() if self._memory_bank else ""
+        content = _format_context(text, self._formatted_state(mood), memory_block=memory_block)
+        return self._history.get_messages() + [{"role": "user", "content": content}]
+
+    def _formatted_state(self, mood: str) -> str:
+        """[GAME STATE] block, re-formatted only after a state update or mood change."""
+        if self._state_cache is None or self._state_cache[0] != mood:
+            block = _format_game_state(self._game_state, mood) if self._game_state else ""
+            self._state_cache = (mood, block)
+        return self._state_cache[1]
+
+    async def _call_claude(self, messages: list[dict],
+                           on_speech: Optional[SpeechCallback] = None,
+                           ) -> tuple[str, Optional[asyncio.Future]]:
+        """
+        Stream a Claude reply. Complete sentences go to on_speech as they
+        arrive so TTS overlaps generation. Returns the full response text and
+        a future that resolves once its speech has played (None without on_speech).
+        """
+        await self._limiter.acquire()
+
+        chunks = []
+        pending = ""
+        sentences: Optional[asyncio.Queue] = None  # this reply's speech, once it has a turn
+        speech: Optional[asyncio.Task] = None
+
+        def say(sentence: str):
+            nonlocal sentences, speech
+            if sentences is None:
+                # Take the reply's turn on its first sentence so overlapping
+                # replies play one after another rather than interleaved
+                sentences = asyncio.Queue()
+                turn = asyncio.get_running_loop().create_future()
+                previous, self._speech_turn = self._speech_turn, turn
+                speech = asyncio.create_task(_speak_reply(sentences, on_speech, previous, turn))
+            sentences.put_nowait(sentence)
 
-    async def _call_claude(self, messages: list[dict]) -> str:
-        """Call Claude API in an executor to avoid blocking asyncio."""
-        loop = asyncio.get_event_loop()
         try:
-            response = await loop.run_in_executor(None, lambda: self._client.messages.create(
-                model=MODEL,
-                max_tokens=MAX_TOKENS,
-                system=SYSTEM_PROMPT,
-                messages=messages,
-            ))
-            return response.content[0].text
-        except Exception as e:
-            logger.error(f"Claude API error: {e}")
-            return "...bruh my brain just lagged, what were you saying?"
+            try:
+                async with self._client.messages.stream(
+                    model=_CFG.model,
+                    max_tokens=_CFG.max_tokens,
+                    system=_SYSTEM_BLOCK,
+                    messages=messages,
+                ) as stream:
+                    async for delta in stream.text_stream:
+                        chunks.append(delta)
+                        if on_speech:
+                            pending += delta
+                            sentence, pending = _split_speakable(pending)
+                            if sentence:
+                                say(sentence)
+                response = "".join(chunks)
+            except Exception as e:
+                logger.error(f"Claude API error: {e}")
+                if chunks:
+                    # Failed mid-reply — part of it may already be spoken, so keep it
+                    response = "".join(chunks)
+                else:
+                    response = pending = "...bruh my brain just lagged, what were you saying?"
+
+            if not on_speech:
+                return response, None
+            tail, _ = _extract_actions(pending)
+            if tail:
+                say(tail)
+            return response, speech if speech is not None else asyncio.gather()
+        finally:
+            if sentences is not None:
+                sentences.put_nowait(None)  # always end the reply, or its turn never passes
+
+
+# ── Event prompts ────────────────────────────────────────────────────────────
+
+# event_type → (template, defaults for missing data fields)
+_EVENT_TEMPLATES: dict[str, tuple[str, dict]] = {
+    "mob_spawn": ("[EVENT] A {name} just spawned {distance} blocks away from us.",
+                  {"name": "something", "distance": "?"}),
+    "player_death": ("[EVENT] I just died. Death message: {cause}",
+                     {"cause": "something"}),
+    "health_low": ("[EVENT] My health just dropped to {health} hearts.",
+                   {"health": "?"}),
+    "food_low": ("[EVENT] My food bar is at {food}/20. Embed [ACTION:eat] in your response to eat now if I have food in inventory.",
+                 {"food": "?"}),
+    "weather_change": ("[EVENT] Weather changed — it's now {weather}.",
+                       {"weather": "unknown"}),
+    "player_join": ("[EVENT] {name} just joined the server.",
+                    {"name": "someone"}),
+    "health_critical": ("[EVENT] My health is at {health} — that's critical, we need to act fast.",
+                        {"health": "?"}),
+    "night_fall": ("[EVENT] It just turned night. Mobs are going to start spawning.", {}),
+    "dawn": ("[EVENT] Sun's coming up. We made it through the night.", {}),
+    "biome_change": ("[EVENT] We just crossed into a {to} biome (was {from}).",
+                     {"from": "somewhere", "to": "somewhere"}),
+    "creeper_nearby": ("[EVENT] There's a creeper only {distance} blocks away from us.",
+                       {"distance": "?"}),
+    "mob_killed": ("[EVENT] Just took out a {mob}. Nice.",
+                   {"mob": "something"}),
+}
+
+
+def _item_pickup_prompt(data: dict) -> str:
+    item = data.get("item", "something")
+    who = "I" if data.get("collector") == "bot" else "You"
+    return f"[EVENT] {who} just picked up {item}."
+
+
+def _under_attack_prompt(data: dict) -> str:
+    attacker = data.get("attacker", "something")
+    hp = data.get("health", "?")
+    action = data.get("action_taken", "nothing")
+    return f"[EVENT] I'm being attacked by a {attacker}! HP: {hp}. I auto-{action}ed."
+
+
+# Events whose prompt needs derived fields
+_EVENT_FUNCS = {
+    "item_pickup": _item_pickup_prompt,
+    "under_attack": _under_attack_prompt,
+}
 
 
 def _build_event_prompt(event_type: str, data: dict) -> str:
     """Build a natural-language prompt from a game event."""
-    if event_type == "mob_spawn":
-        name = data.get("name", "something")
-        dist = data.get("distance", "?")
-        return f"[EVENT] A {name} just spawned {dist} blocks away from us."
-
-    if event_type == "player_death":
-        cause = data.get("cause", "something")
-        return f"[EVENT] I just died. Death message: {cause}"
-
-    if event_type == "health_low":
-        hp = data.get("health", "?")
-        return f"[EVENT] My health just dropped to {hp} hearts."
-
-    if event_type == "food_low":
-        food = data.get("food", "?")
-        return f"[EVENT] My food bar is at {food}/20. Embed [ACTION:eat] in your response to eat now if I have food in inventory."
-
-    if event_type == "weather_change":
-        weather = data.get("weather", "unknown")
-        return f"[EVENT] Weather changed — it's now {weather}."
-
-    if event_type == "player_join":
-        name = data.get("name", "someone")
-        return f"[EVENT] {name} just joined the server."
-
-    if event_type == "health_critical":
-        hp = data.get("health", "?")
-        return f"[EVENT] My health is at {hp} — that's critical, we need to act fast."
-
-    if event_type == "night_fall":
-        return "[EVENT] It just turned night. Mobs are going to start spawning."
-
-    if event_type == "dawn":
-        return "[EVENT] Sun's coming up. We made it through the night."
-
-    if event_type == "biome_change":
-        frm = data.get("from", "somewhere")
-        to = data.get("to", "somewhere")
-        return f"[EVENT] We just crossed into a {to} biome (was {frm})."
-
-    if event_type == "item_pickup":
-        item = data.get("item", "something")
-        who = "I" if data.get("collector") == "bot" else "You"
-        return f"[EVENT] {who} just picked up {item}."
-
-    if event_type == "creeper_nearby":
-        dist = data.get("distance", "?")
-        return f"[EVENT] There's a creeper only {dist} blocks away from us."
-
-    if event_type == "under_attack":
-        attacker = data.get("attacker", "something")
-        hp = data.get("health", "?")
-        action = data.get("action_taken", "nothing")
-        return f"[EVENT] I'm being attacked by a {attacker}! HP: {hp}. I auto-{action}ed."
-
-    if event_type == "mob_killed":
-        mob = data.get("mob", "something")
-        return f"[EVENT] Just took out a {mob}. Nice."
-
-    return f"[EVENT] {event_type}: {json.dumps(data)}"
+    func = _EVENT_FUNCS.get(event_type)
+    if func:
+        return func(data)
+
+    entry = _EVENT_TEMPLATES.get(event_type)
+    if entry:
+        template, defaults = entry
+        return template.format_map({**defaults, **data})
+
+    return f"[EVENT] {event_type}: {dumps(data).decode()}"
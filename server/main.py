@@ -12,15 +12,23 @@ import asyncio
 import json
 import logging
 import os
+import signal
 import sys
+from typing import Optional
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Windows asyncio compatibility
+# Windows asyncio compatibility; uvloop elsewhere when installed
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+else:
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
 
 # ── Logging ──────────────────────────────────────────────────────────────────
 
@@ -54,27 +62,28 @@ ws_server: WSServer = None  # set in main()
 
 # ── Response handler ─────────────────────────────────────────────────────────
 
-async def handle_response(text: str, actions: list[dict], voice_pipeline: VoicePipeline):
-    """Send AI response to TTS, in-game chat, and execute any actions."""
+async def handle_response(text: str, actions: list[dict], voice_pipeline: VoicePipeline,
+                          speech: Optional[asyncio.Future] = None):
+    """
+    Send AI response to TTS, in-game chat, and execute any actions.
+    Pass the brain's speech future when it already streamed the reply to TTS.
+    """
     if not text:
+        if speech is not None:
+            await speech
         return
 
-    # Collapse newlines into a single line — prevents mineflayer from splitting
-    # into multiple chat messages (which causes TTS to only speak the last one)
-    clean = " ".join(text.split())
-
-    # TTS and chat in parallel
-    tts_task = asyncio.create_task(voice_pipeline.tts.speak(clean))
-    chat_task = asyncio.create_task(ws_server.send_chat(clean))
-
-    # Execute extracted actions (skip send_chat — already handled above)
-    for action in actions:
-        if action["action"] == "send_chat":
-            continue
-        await ws_server.send_action(action["action"], action.get("params", {}))
+    # TTS, chat, and extracted actions in parallel (skip send_chat — already handled)
+    tasks = [asyncio.create_task(ws_server.send_chat(text))]
+    tasks.append(speech if speech is not None
+                 else asyncio.create_task(voice_pipeline.tts.speak(text)))
+    tasks += [
+        asyncio.create_task(ws_server.send_action(action["action"], action.get("params", {})))
+        for action in actions
+        if action["action"] != "send_chat"
+    ]
 
-    await tts_task
-    await chat_task
+    await asyncio.gather(*tasks)
 
 
 # ── Voice transcript callback ────────────────────────────────────────────────
@@ -83,10 +92,10 @@ async def on_transcript(transcript: str):
     """Called when STT produces a transcript from voice input."""
     logger.info(f"Voice: '{transcript}'")
 
-    text, actions = await brain.think(transcript)
+    text, actions, speech = await brain.think(transcript, on_speech=_voice_pipeline.tts.speak)
     logger.info(f"Brain: '{text}'")
 
-    await handle_response(text, actions, _voice_pipeline)
+    await handle_response(text, actions, _voice_pipeline, speech)
 
 
 # ── Game event handler ───────────────────────────────────────────────────────
@@ -117,18 +126,21 @@ async def on_game_event(msg: dict):
         message = data.get("message", "")
         if message:
             logger.info(f"Chat from {username}: '{message}'")
-            text, actions = await brain.think(f"{username} says in chat: {message}")
+            text, actions, speech = await brain.think(f"{username} says in chat: {message}",
+                                                      on_speech=_voice_pipeline.tts.speak)
             logger.info(f"Brain: '{text}'")
-            await handle_response(text, actions, _voice_pipeline)
+            await handle_response(text, actions, _voice_pipeline, speech)
         return
 
     # Proactive events — rate-limited AI response
     logger.info(f"Game event: {event_type} — {data}")
-    result = await brain.handle_game_event(event_type, data)
-    if result:
-        text, actions = result
+    result = await brain.handle_game_event(event_type, data, on_speech=_voice_pipeline.tts.speak)
+    # Then work through anything that queued up behind this call
+    while result:
+        text, actions, speech = result
         logger.info(f"Brain (proactive): '{text}'")
-        await handle_response(text, actions, _voice_pipeline)
+        await handle_response(text, actions, _voice_pipeline, speech)
+        result = await brain.handle_queued_event(on_speech=_voice_pipeline.tts.speak)
 
 
 # ── PTT callbacks ────────────────────────────────────────────────────────────
@@ -160,7 +172,7 @@ async def main():
     await ws_server.start()
 
     # Voice pipeline
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     _voice_pipeline = VoicePipeline(
         on_transcript=on_transcript,
         on_ptt_start=on_ptt_start,
@@ -171,13 +183,21 @@ async def main():
     logger.info("CoopBuddy is ready! Hold 'V' to talk.")
     logger.info("Waiting for Minecraft bot to connect on ws://localhost:8765...")
 
-    # Keep running
+    # Park until a shutdown signal. Windows has no loop signal handlers —
+    # Ctrl+C arrives as KeyboardInterrupt there instead.
+    stop_event = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
     try:
-        while True:
-            await asyncio.sleep(1)
+        await stop_event.wait()
     except KeyboardInterrupt:
-        logger.info("Shutting down...")
+        pass
     finally:
+        logger.info("Shutting down...")
         await ws_server.stop()
 
 
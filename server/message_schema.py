@@ -10,6 +10,18 @@ All messages are JSON objects with a 'type' field:
 from typing import Any, Optional
 import time
 
+import orjson
+
+
+# ── Serialization ──────────────────────────────────────────────────────────
+
+def dumps(msg: Any) -> bytes:
+    """Serialize a message to UTF-8 JSON bytes, ready to send on the socket."""
+    return orjson.dumps(msg, option=orjson.OPT_NON_STR_KEYS)
+
+
+loads = orjson.loads
+
 
 # ── Inbound: Node → Python ─────────────────────────────────────────────────
 
@@ -64,11 +76,10 @@ def make_pong(ping_timestamp: float) -> dict:
 
 # ── Validation helpers ─────────────────────────────────────────────────────
 
-VALID_TYPES = {"game_event", "action", "ping", "pong"}
+VALID_TYPES = frozenset({"game_event", "action", "ping", "pong"})
 
 
 def validate_message(msg: Any) -> bool:
     """Return True if msg is a dict with a known 'type' field."""
-    if not isinstance(msg, dict):
-        return False
-    return msg.get("type") in VALID_TYPES
+    # Exact type check: decoded JSON objects are always plain dicts
+    return type(msg) is dict and msg.get("type") in VALID_TYPES
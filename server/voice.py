@@ -2,21 +2,20 @@
 Voice pipeline — push-to-talk → STT → TTS.
 
 AudioCapture: Records mic while PTT key is held.
-STT: Transcribes audio via faster-whisper (lazy-loaded).
+STT: Transcribes audio via faster-whisper (preloaded at startup).
 TTS: ElevenLabs streaming with pyttsx3 fallback.
 VoicePipeline: Wires PTT key → capture → STT, exposes TTS.speak().
 """
 
 import asyncio
-import io
 import json
 import logging
 import os
+import queue
 import struct
-import tempfile
 import threading
 import time
-import wave
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -37,29 +36,51 @@ with open(_SETTINGS_PATH) as f:
 _VOICE = _SETTINGS["voice"]
 PTT_KEY = _SETTINGS["ptt_key"]
 STT_MODEL = _VOICE["stt_model"]
+# 0 = auto: half the logical cores (physical cores on most SMT machines)
+STT_CPU_THREADS = _VOICE.get("stt_cpu_threads", 0) or max(1, (os.cpu_count() or 2) // 2)
+# >1 enables BatchedInferencePipeline (faster-whisper >= 1.1) for utterances past one
+# 30s Whisper window — only reachable if max_recording_seconds is raised above 30 too
+STT_BATCH_SIZE = _VOICE.get("stt_batch_size", 0)
 MIN_RECORDING_SECS = _VOICE["min_recording_seconds"]
+MAX_RECORDING_SECS = _VOICE.get("max_recording_seconds", 30)
+# Recordings whose loudest 30ms frame stays below this int16 RMS never reach STT
+SILENCE_RMS_THRESHOLD = _VOICE.get("silence_rms_threshold", 300)
 MIN_TRANSCRIPT_WORDS = _VOICE["min_transcript_words"]
 STT_LOGPROB_THRESHOLD = _VOICE["stt_logprob_threshold"]
 TTS_PROVIDER = _VOICE["tts_provider"]
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
+WHISPER_WINDOW_SAMPLES = 30 * SAMPLE_RATE  # Whisper decodes audio in 30s windows
+RMS_FRAME_SAMPLES = SAMPLE_RATE * 30 // 1000  # 30ms — short enough that one word registers
+
+# 44-byte RIFF/WAVE header for 16-bit PCM — only the two size fields vary per clip
+_WAV_HEADER = (
+    b"RIFF\0\0\0\0WAVEfmt "
+    + struct.pack("<IHHIIHH", 16, 1, CHANNELS, SAMPLE_RATE, SAMPLE_RATE * CHANNELS * 2, CHANNELS * 2, 16)
+    + b"data\0\0\0\0"
+)
 
 
 # ── Audio Capture ────────────────────────────────────────────────────────────
 
 class AudioCapture:
-    """Records microphone audio while PTT is held. Returns WAV bytes on release."""
+    """Records microphone audio while PTT is held. Returns int16 samples on release."""
 
     def __init__(self):
-        self._frames: list[np.ndarray] = []
+        self._buf: Optional[np.ndarray] = None
+        self._write = 0
+        self._truncated = False
         self._stream: Optional[sd.InputStream] = None
         self._recording = False
         self._start_time = 0.0
 
     def start(self):
         """Begin recording from microphone."""
-        self._frames = []
+        # Fresh buffer per recording — the previous one may still be in STT
+        self._buf = np.empty(int(SAMPLE_RATE * MAX_RECORDING_SECS), dtype=np.int16)
+        self._write = 0
+        self._truncated = False
         self._recording = True
         self._start_time = time.time()
 
@@ -81,7 +102,12 @@ class AudioCapture:
         logger.debug(f"Recording started (device: {device or 'default'})")
 
     def stop(self) -> Optional[bytes]:
-        """Stop recording. Returns WAV bytes, or None if too short."""
+        """Stop recording. Returns WAV bytes, or None if too short or silent."""
+        audio = self.stop_raw()
+        return self._to_wav(audio) if audio is not None else None
+
+    def stop_raw(self) -> Optional[np.ndarray]:
+        """Stop recording. Returns mono int16 samples, or None if too short or silent."""
         self._recording = False
         if self._stream:
             self._stream.stop()
@@ -93,93 +119,214 @@ class AudioCapture:
             logger.debug(f"Recording too short ({duration:.2f}s), discarding")
             return None
 
-        if not self._frames:
+        if self._write == 0:
+            return None
+
+        audio = self._buf[:self._write]
+        rms = self._peak_rms(audio)
+        if rms < SILENCE_RMS_THRESHOLD:
+            logger.info(f"Recording is silence (peak rms {rms} < {SILENCE_RMS_THRESHOLD}), discarding")
             return None
 
-        audio = np.concatenate(self._frames)
-        return self._to_wav(audio)
+        return audio
 
     def _callback(self, indata, frames, time_info, status):
         if status:
             logger.warning(f"Audio callback status: {status}")
-        if self._recording:
-            self._frames.append(indata.copy())
+        if not self._recording:
+            return
+        # Copy straight into the preallocated buffer; drop audio past MAX_RECORDING_SECS
+        n = min(len(indata), len(self._buf) - self._write)
+        if n < len(indata) and not self._truncated:
+            self._truncated = True
+            logger.warning(f"Recording hit max_recording_seconds ({MAX_RECORDING_SECS}s) — "
+                           "dropping the rest")
+        if n <= 0:
+            return
+        self._buf[self._write:self._write + n] = indata[:n, 0]
+        self._write += n
+
+    @staticmethod
+    def _peak_rms(audio: np.ndarray) -> int:
+        """RMS of the loudest 30ms frame — a short phrase in a long hold still counts."""
+        n = len(audio) - len(audio) % RMS_FRAME_SAMPLES
+        frames = audio[:n].reshape(-1, RMS_FRAME_SAMPLES) if n else audio[None, :]
+        power = np.mean(np.square(frames, dtype=np.int32), axis=1)
+        return int(np.sqrt(power.max()))
 
     @staticmethod
     def _to_wav(audio: np.ndarray) -> bytes:
         """Convert int16 numpy array to WAV bytes."""
-        buf = io.BytesIO()
-        with wave.open(buf, "wb") as wf:
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(2)  # int16
-            wf.setframerate(SAMPLE_RATE)
-            wf.writeframes(audio.tobytes())
-        return buf.getvalue()
+        data = memoryview(audio).cast("B")
+        buf = bytearray(len(_WAV_HEADER) + len(data))
+        buf[:len(_WAV_HEADER)] = _WAV_HEADER
+        struct.pack_into("<I", buf, 4, len(buf) - 8)   # RIFF chunk size
+        struct.pack_into("<I", buf, 40, len(data))     # data chunk size
+        buf[len(_WAV_HEADER):] = data
+        return bytes(buf)
 
 
 # ── STT (Speech-to-Text) ────────────────────────────────────────────────────
 
 class STT:
-    """Transcribes audio using faster-whisper. Lazy-loads model on first use."""
+    """Transcribes audio using faster-whisper. Model loads on preload() or first use."""
 
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None):
+        self._executor = executor
         self._model = None
+        self._batched = None
+        self._speech_timestamps = None  # faster_whisper.vad.get_speech_timestamps, set on load
+        self._vad_options = None
+        self._load_lock = threading.Lock()  # preload and an early PTT may race
+
+    def preload(self):
+        """Load the model ahead of the first utterance. Blocking — run in an executor."""
+        try:
+            self._ensure_model()
+        except Exception as e:
+            logger.error(f"STT preload failed: {e}")
 
     def _ensure_model(self):
-        if self._model is None:
-            logger.info(f"Loading faster-whisper model '{STT_MODEL}' (first use)...")
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            logger.info(f"Loading faster-whisper model '{STT_MODEL}'...")
             from faster_whisper import WhisperModel
-            self._model = WhisperModel(STT_MODEL, device="cpu", compute_type="int8")
-            logger.info("STT model loaded")
-
-    async def transcribe(self, wav_bytes: bytes) -> Optional[str]:
-        """Transcribe WAV bytes to text. Returns None if low quality or too short."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._transcribe_sync, wav_bytes)
-
-    def _transcribe_sync(self, wav_bytes: bytes) -> Optional[str]:
+            from faster_whisper.vad import VadOptions, get_speech_timestamps
+            if not (STT_MODEL.endswith(".en") or STT_MODEL.startswith("distil-")):
+                logger.warning(f"STT model '{STT_MODEL}' is multilingual — an English-only "
+                               "model (base.en, small.en, distil-small.en) is faster here")
+            model = WhisperModel(
+                STT_MODEL,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=STT_CPU_THREADS,
+                num_workers=1,
+            )
+            # Warm up on 0.1s of silence so the first utterance skips one-time setup
+            segments, _ = model.transcribe(np.zeros(SAMPLE_RATE // 10, dtype=np.float32), language="en")
+            list(segments)
+            if STT_BATCH_SIZE > 1:
+                if SAMPLE_RATE * MAX_RECORDING_SECS <= WHISPER_WINDOW_SAMPLES:
+                    logger.warning("stt_batch_size has no effect unless max_recording_seconds "
+                                   "is above 30 — not loading the batched pipeline")
+                else:
+                    try:
+                        from faster_whisper import BatchedInferencePipeline
+                        self._batched = BatchedInferencePipeline(model=model)
+                    except ImportError:
+                        logger.warning("stt_batch_size needs faster-whisper >= 1.1 — "
+                                       "continuing without batched inference")
+            self._speech_timestamps = get_speech_timestamps
+            self._vad_options = VadOptions()
+            self._model = model
+            logger.info(f"STT model loaded ({STT_CPU_THREADS} CPU threads)")
+
+    async def transcribe(self, samples: np.ndarray) -> Optional[str]:
+        """Transcribe int16 samples to text. Returns None if low quality or too short."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._transcribe_sync, samples)
+
+    def _transcribe_sync(self, samples: np.ndarray) -> Optional[str]:
         self._ensure_model()
 
-        # Write to temp file (faster-whisper needs a file path)
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-            tmp.write(wav_bytes)
-            tmp_path = tmp.name
+        # faster-whisper takes float32 PCM in [-1, 1) directly — no WAV/disk round trip
+        audio = samples.astype(np.float32) / 32768.0
 
-        try:
-            segments, info = self._model.transcribe(
-                tmp_path,
+        # Gate on Silero VAD once up front: skip Whisper entirely when there's no
+        # speech, otherwise keep only the speech chunks — long pauses left in are
+        # where Whisper hallucinates filler (timestamps already include padding).
+        # Concatenated here: collect_chunks' return type changed in 1.1
+        speech = self._speech_timestamps(audio, self._vad_options)
+        if not speech:
+            logger.debug("No speech detected — skipping transcription")
+            return None
+        audio = np.concatenate([audio[c["start"]:c["end"]] for c in speech])
+
+        if self._batched is not None and len(audio) > WHISPER_WINDOW_SAMPLES:
+            # Spans several windows — decode its speech chunks as one batch
+            # (the batched pipeline chunks on VAD, so it keeps its own pass)
+            segments, info = self._batched.transcribe(
+                audio,
+                batch_size=STT_BATCH_SIZE,
                 vad_filter=True,
                 language="en",
             )
+        else:
+            segments, info = self._model.transcribe(
+                audio,
+                vad_filter=False,
+                language="en",
+            )
 
-            texts = []
-            for seg in segments:
-                if seg.avg_logprob < STT_LOGPROB_THRESHOLD:
-                    continue
-                texts.append(seg.text.strip())
+        texts = []
+        for seg in segments:
+            if seg.avg_logprob < STT_LOGPROB_THRESHOLD:
+                continue
+            texts.append(seg.text.strip())
 
-            transcript = " ".join(texts).strip()
+        transcript = " ".join(texts).strip()
 
-            if len(transcript.split()) < MIN_TRANSCRIPT_WORDS:
-                logger.debug(f"Transcript too short: '{transcript}'")
-                return None
+        if len(transcript.split()) < MIN_TRANSCRIPT_WORDS:
+            logger.debug(f"Transcript too short: '{transcript}'")
+            return None
 
-            logger.info(f"Transcribed: '{transcript}'")
-            return transcript
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+        logger.info(f"Transcribed: '{transcript}'")
+        return transcript
 
 
 # ── TTS (Text-to-Speech) ─────────────────────────────────────────────────────
 
+class _PcmFeeder:
+    """sounddevice output callback: plays int16 chunks from a queue until a None sentinel."""
+
+    def __init__(self, chunks: queue.SimpleQueue):
+        self._chunks = chunks
+        self._pending = np.empty(0, dtype=np.int16)
+        self._ended = False
+
+    def __call__(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames:
+            if not len(self._pending):
+                if self._ended:
+                    break
+                try:
+                    item = self._chunks.get_nowait()
+                except queue.Empty:
+                    break  # synthesis is behind playback — pad with silence
+                if item is None:
+                    self._ended = True
+                    break
+                self._pending = item
+            n = min(frames - filled, len(self._pending))
+            out[filled:filled + n] = self._pending[:n]
+            self._pending = self._pending[n:]
+            filled += n
+        out[filled:] = 0
+        if self._ended and not len(self._pending):
+            raise sd.CallbackStop
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
 class TTS:
     """Text-to-speech with ElevenLabs primary and pyttsx3 fallback."""
 
-    def __init__(self):
-        self._speak_lock = asyncio.Lock()
+    def __init__(self, executor: Optional[Executor] = None,
+                 device_executor: Optional[Executor] = None):
+        self._executor = executor
+        # Output device open/close can block; keep it off the loop and out of
+        # the fetch pool, where it would queue behind the clip's download
+        self._device_executor = device_executor
+        # Resolves when the most recently queued clip has finished playing
+        self._playback: Optional[asyncio.Future] = None
         self._provider = TTS_PROVIDER
         self._eleven_client = None
         self._pyttsx_engine = None
@@ -191,46 +338,120 @@ class TTS:
             self._provider = "pyttsx3"
 
     async def speak(self, text: str):
-        """Speak text aloud. Prevents overlapping output."""
+        """
+        Speak text aloud. Clips play in call order without overlapping, but the
+        next clip is synthesized while the previous one is still playing.
+        """
         if not text or self._provider == "none":
             return
 
-        async with self._speak_lock:
-            loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        previous, self._playback = self._playback, done
+        try:
+            if self._provider == "elevenlabs":
+                try:
+                    await self._play_elevenlabs(loop, text, previous)
+                    return
+                except Exception as e:
+                    logger.error(f"TTS error ({self._provider}): {e}")
+                    logger.info("Falling back to pyttsx3")
+            if previous is not None:
+                await asyncio.shield(previous)
             try:
-                if self._provider == "elevenlabs":
-                    await loop.run_in_executor(None, self._speak_elevenlabs, text)
-                else:
-                    await loop.run_in_executor(None, self._speak_pyttsx3, text)
+                await loop.run_in_executor(self._executor, self._speak_pyttsx3, text)
             except Exception as e:
-                logger.error(f"TTS error ({self._provider}): {e}")
-                # Try fallback if primary fails
-                if self._provider == "elevenlabs":
-                    logger.info("Falling back to pyttsx3")
-                    try:
-                        await loop.run_in_executor(None, self._speak_pyttsx3, text)
-                    except Exception as e2:
-                        logger.error(f"pyttsx3 fallback also failed: {e2}")
-
-    def _speak_elevenlabs(self, text: str):
-        if self._eleven_client is None:
-            from elevenlabs.client import ElevenLabs
-            self._eleven_client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
-
-        voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # default: Rachel
-
-        audio = self._eleven_client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_turbo_v2_5",
-            output_format="pcm_16000",
+                logger.error(f"pyttsx3 TTS failed: {e}")
+        finally:
+            _resolve(done)
+
+    async def _play_elevenlabs(self, loop: asyncio.AbstractEventLoop, text: str,
+                               previous: Optional[asyncio.Future]):
+        chunks: queue.SimpleQueue = queue.SimpleQueue()
+        # Synthesis starts now, overlapping whatever clip is still playing
+        fetch = loop.run_in_executor(self._executor, self._fetch_elevenlabs, text, chunks)
+        if previous is not None:
+            await asyncio.shield(previous)
+
+        # Callback-driven stream: no thread blocks for the length of the clip
+        finished = loop.create_future()
+        try:
+            stream = await loop.run_in_executor(
+                self._device_executor, self._open_stream, chunks,
+                lambda: loop.call_soon_threadsafe(_resolve, finished),
+            )
+        except BaseException:
+            # The caller falls back to pyttsx3 — don't leave a fetch error unretrieved
+            fetch.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        try:
+            await finished
+        finally:
+            await loop.run_in_executor(self._device_executor, stream.close)
+        await fetch  # raises only if no audio arrived — nothing played, so fall back
+
+    @staticmethod
+    def _open_stream(chunks: queue.SimpleQueue, on_finished: Callable[[], None]) -> sd.OutputStream:
+        """Open and start an output stream fed from chunks. Blocking — run in an executor."""
+        stream = sd.OutputStream(
+            samplerate=16000,
+            channels=1,
+            dtype="int16",
+            callback=_PcmFeeder(chunks),
+            finished_callback=on_finished,
         )
+        try:
+            stream.start()
+        except Exception:
+            stream.close()
+            raise
+        return stream
+
+    def _fetch_elevenlabs(self, text: str, chunks: queue.SimpleQueue):
+        """
+        Stream PCM for text into chunks as int16 arrays; None marks the end.
+        Raises only if nothing was queued — a clip cut off mid-stream has
+        already started playing, and a fallback would repeat the whole line.
+        """
+        queued = False
+        try:
+            if self._eleven_client is None:
+                import httpx
+                from elevenlabs.client import ElevenLabs
+                # One HTTP/2 keep-alive pool for the TTS lifetime — later utterances skip the TLS handshake
+                self._eleven_client = ElevenLabs(
+                    api_key=os.getenv("ELEVENLABS_API_KEY"),
+                    httpx_client=httpx.Client(
+                        http2=True,
+                        timeout=httpx.Timeout(30.0, connect=5.0),
+                        limits=httpx.Limits(max_keepalive_connections=4),
+                    ),
+                )
+
+            voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # default: Rachel
+
+            audio = self._eleven_client.text_to_speech.convert(
+                text=text,
+                voice_id=voice_id,
+                model_id="eleven_turbo_v2_5",
+                output_format="pcm_16000",
+                optimize_streaming_latency=3,
+            )
 
-        # Collect all chunks then play
-        pcm_data = b"".join(audio)
-        audio_array = np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768.0
-        sd.play(audio_array, samplerate=16000)
-        sd.wait()
+            leftover = b""
+            for chunk in audio:
+                data = leftover + chunk
+                usable = len(data) - len(data) % 2  # a sample can straddle two chunks
+                leftover = data[usable:]
+                if usable:
+                    chunks.put(np.frombuffer(data, dtype=np.int16, count=usable // 2))
+                    queued = True
+        except Exception as e:
+            if not queued:
+                raise
+            logger.error(f"ElevenLabs stream cut off: {e}")
+        finally:
+            chunks.put(None)
 
     def _speak_pyttsx3(self, text: str):
         # Create a fresh engine each call — pyttsx3's COM objects
@@ -245,6 +466,13 @@ class TTS:
 
 # ── Voice Pipeline ───────────────────────────────────────────────────────────
 
+def _log_capture_error(fut: Future):
+    """Done-callback for capture executor jobs — nothing else reads their result."""
+    e = None if fut.cancelled() else fut.exception()
+    if e is not None:
+        logger.error(f"Audio capture failed: {e}", exc_info=e)
+
+
 class VoicePipeline:
     """
     Wires PTT key → AudioCapture → STT.
@@ -262,9 +490,19 @@ class VoicePipeline:
         self._on_ptt_start = on_ptt_start
         self._on_ptt_stop = on_ptt_stop
 
+        # Dedicated single-thread pools: the Whisper model isn't safe to call
+        # concurrently, and TTS network/playback shouldn't queue behind STT
+        # (or behind anything else on the default executor)
+        self._stt_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt")
+        self._tts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self._audio_out_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-out")
+        # Mic start/stop runs here so the keyboard hook thread never blocks;
+        # a single worker keeps start/stop in key order
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+
         self._capture = AudioCapture()
-        self.stt = STT()
-        self.tts = TTS()
+        self.stt = STT(self._stt_executor)
+        self.tts = TTS(self._tts_executor, self._audio_out_executor)
 
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._ptt_held = False
@@ -277,6 +515,9 @@ class VoicePipeline:
 
         keyboard.on_press_key(PTT_KEY, self._on_key_down, suppress=False)
         keyboard.on_release_key(PTT_KEY, self._on_key_up, suppress=False)
+
+        # Load the STT model in the background so the first utterance doesn't wait on it
+        loop.run_in_executor(self._stt_executor, self.stt.preload)
         logger.info(f"Voice pipeline ready — hold '{PTT_KEY}' to talk")
 
     def _on_key_down(self, event):
@@ -287,23 +528,32 @@ class VoicePipeline:
         if self._on_ptt_start:
             self._on_ptt_start()
 
-        self._capture.start()
+        self._capture_executor.submit(self._capture.start).add_done_callback(_log_capture_error)
 
     def _on_key_up(self, event):
         if not self._ptt_held:
             return
         self._ptt_held = False
 
-        wav_bytes = self._capture.stop()
+        stopped = self._capture_executor.submit(self._capture.stop_raw)
 
         if self._on_ptt_stop:
             self._on_ptt_stop()
 
-        if wav_bytes and self._loop:
-            asyncio.run_coroutine_threadsafe(self._process(wav_bytes), self._loop)
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._handle_release(stopped), self._loop)
+
+    async def _handle_release(self, stopped: Future):
+        """Wait for the capture thread to hand back samples, then run the pipeline."""
+        try:
+            samples = await asyncio.wrap_future(stopped)
+            if samples is not None:
+                await self._process(samples)
+        except Exception as e:
+            logger.error(f"Voice input failed: {e}", exc_info=True)
 
-    async def _process(self, wav_bytes: bytes):
+    async def _process(self, samples: np.ndarray):
         """STT → callback with transcript."""
-        transcript = await self.stt.transcribe(wav_bytes)
+        transcript = await self.stt.transcribe(samples)
         if transcript:
             await self._on_transcript(transcript)
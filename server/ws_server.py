@@ -7,7 +7,7 @@ Sends action messages to Node/Mineflayer.
 """
 
 import asyncio
-import json
+import functools
 import logging
 import time
 from typing import Optional, Callable, Awaitable
@@ -15,12 +15,23 @@ from typing import Optional, Callable, Awaitable
 import websockets
 from websockets.server import WebSocketServerProtocol
 
-from server.message_schema import make_pong, validate_message
+from server.message_schema import dumps, loads, make_pong, validate_message
 
 logger = logging.getLogger(__name__)
 
 PORT = 8765
 PING_INTERVAL = 15  # seconds
+EVENT_QUEUE_SIZE = 64  # game events buffered before new ones are dropped
+EVENT_WORKERS = 4      # handlers mostly await Claude/TTS/WS, so a few run at once
+
+# Pings have a fixed shape — format the timestamp into bytes, no dict or encoder
+_PING_TEMPLATE = b'{"type":"ping","timestamp":%f}'
+
+
+@functools.lru_cache(maxsize=64)
+def _action_prefix(action: str) -> bytes:
+    """Serialized '{"type":"action","action":<name>,"params":' — static per action name."""
+    return b'{"type":"action","action":' + dumps(action) + b',"params":'
 
 
 class WSServer:
@@ -32,8 +43,11 @@ class WSServer:
         """
         self._on_game_event = on_game_event
         self._connection: Optional[WebSocketServerProtocol] = None
-        self._send_lock = asyncio.Lock()
+        self._outbox: asyncio.Queue = asyncio.Queue()  # frames for the connection's writer task
         self._server = None
+        self._event_queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._event_workers: list[asyncio.Task] = []
+        self._dropped_events = 0
 
     # ── Public API ─────────────────────────────────────────────────────────
 
@@ -42,8 +56,7 @@ class WSServer:
         if self._connection is None:
             logger.warning("send_action called with no active bot connection")
             return False
-        msg = {"type": "action", "action": action, "params": params or {}}
-        return await self._send(msg)
+        return await self._send_raw(_action_prefix(action) + dumps(params or {}) + b"}")
 
     async def send_chat(self, message: str) -> bool:
         """Convenience wrapper: send a chat message via the bot."""
@@ -61,10 +74,16 @@ class WSServer:
             PORT,
             ping_interval=None,   # we do manual ping/pong
             ping_timeout=None,
+            compression=None,     # localhost peer — deflate costs CPU and saves nothing
+            max_size=2 ** 20,
         )
+        self._event_workers = [asyncio.create_task(self._event_worker()) for _ in range(EVENT_WORKERS)]
         logger.info("WebSocket server ready")
 
     async def stop(self):
+        for task in self._event_workers:
+            task.cancel()
+        self._event_workers = []
         if self._server:
             self._server.close()
             await self._server.wait_closed()
@@ -75,9 +94,11 @@ class WSServer:
     async def _handle_connection(self, websocket: WebSocketServerProtocol):
         remote = websocket.remote_address
         logger.info(f"Bot connected from {remote}")
+        self._outbox = asyncio.Queue()  # nothing queued for an old connection carries over
         self._connection = websocket
 
-        ping_task = asyncio.create_task(self._heartbeat(websocket))
+        writer_task = asyncio.create_task(self._writer(websocket, self._outbox))
+        ping_task = asyncio.create_task(self._heartbeat())
 
         try:
             async for raw in websocket:
@@ -86,13 +107,14 @@ class WSServer:
             logger.info(f"Bot disconnected: {e}")
         finally:
             ping_task.cancel()
+            writer_task.cancel()
             self._connection = None
             logger.info("Bot connection cleaned up")
 
-    async def _dispatch(self, raw: str):
+    async def _dispatch(self, raw: str | bytes):
         try:
-            msg = json.loads(raw)
-        except json.JSONDecodeError:
+            msg = loads(raw)
+        except ValueError:
             logger.warning(f"Received non-JSON message: {raw[:100]}")
             return
 
@@ -109,43 +131,59 @@ class WSServer:
             pass  # heartbeat acknowledged
 
         elif msg_type == "game_event":
-            # Fire as a background task so the message loop stays responsive to pings
-            asyncio.create_task(self._run_game_event(msg))
+            # Hand off to the workers so the message loop stays responsive to pings;
+            # bounded so an event storm can't pile up unlimited tasks
+            try:
+                self._event_queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                self._dropped_events += 1
+                logger.warning(f"Event queue full — dropped '{msg.get('event_type')}' "
+                               f"({self._dropped_events} dropped so far)")
 
         else:
             logger.debug(f"Unhandled message type: {msg_type}")
 
-    async def _run_game_event(self, msg: dict):
-        """Background task wrapper for game event handler — isolates errors from message loop."""
-        try:
-            await self._on_game_event(msg)
-        except Exception as e:
-            logger.error(f"Error in game_event handler: {e}", exc_info=True)
+    async def _event_worker(self):
+        """Drains the game event queue — isolates handler errors from the message loop."""
+        while True:
+            msg = await self._event_queue.get()
+            try:
+                await self._on_game_event(msg)
+            except Exception as e:
+                logger.error(f"Error in game_event handler: {e}", exc_info=True)
+            finally:
+                self._event_queue.task_done()
 
     async def _send(self, msg: dict) -> bool:
+        return await self._send_raw(dumps(msg))
+
+    async def _send_raw(self, payload: bytes) -> bool:
+        """Queue an already-serialized JSON frame for the writer task."""
         if self._connection is None:
             return False
-        try:
-            async with self._send_lock:
-                await self._connection.send(json.dumps(msg))
-            return True
-        except websockets.exceptions.ConnectionClosed:
-            logger.warning("Tried to send but connection is closed")
-            self._connection = None
-            return False
-        except Exception as e:
-            logger.error(f"Send error: {e}")
-            return False
+        self._outbox.put_nowait(payload)
+        return True
 
-    async def _heartbeat(self, websocket: WebSocketServerProtocol):
-        """Send a ping every PING_INTERVAL seconds to keep the connection alive."""
+    async def _writer(self, websocket: WebSocketServerProtocol, outbox: asyncio.Queue):
+        """Sole writer for a connection — sends queued frames in order."""
         try:
             while True:
-                await asyncio.sleep(PING_INTERVAL)
-                ping_msg = {"type": "ping", "timestamp": time.time()}
+                payload = await outbox.get()
                 try:
-                    await websocket.send(json.dumps(ping_msg))
+                    await websocket.send(payload)
                 except websockets.exceptions.ConnectionClosed:
+                    logger.warning("Tried to send but connection is closed")
                     break
+                except Exception as e:
+                    logger.error(f"Send error: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def _heartbeat(self):
+        """Queue a ping every PING_INTERVAL seconds to keep the connection alive."""
+        try:
+            while True:
+                await asyncio.sleep(PING_INTERVAL)
+                await self._send_raw(_PING_TEMPLATE % time.time())
         except asyncio.CancelledError:
             pass